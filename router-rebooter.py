@@ -41,9 +41,14 @@ INSTALLATION:
     3. Install required packages:
        pip install RPi.GPIO
 
-    Note: RPi.GPIO is the only external dependency. All other modules
+    Note: RPi.GPIO is the only required external dependency. All other modules
           (time, subprocess, logging, signal, sys, threading, http.server)
-          are part of Python's standard library.
+          are part of Python's standard library. If SSL is enabled, the
+          optional cryptography package (pip install cryptography) is used
+          to generate the self-signed certificate; otherwise the openssl
+          command is used. If the libgpiod Python bindings (v1 API, e.g.
+          the python3-libgpiod package) are available, the relay pin is
+          driven through them instead of RPi.GPIO.
 
 USAGE:
     1. Create a configuration file:
@@ -111,8 +116,11 @@ CONFIGURATION:
     ping_retries = 5                  # Number of ping retries before declaring offline
     ping_timeout = 2                  # Seconds to wait for ping response
     ping_packet_size = 0              # Ping packet data size in bytes (0-65507, default 0)
+    tcp_check_port = 53               # TCP port tried on a ping host before pinging (0 to disable)
     check_interval_online = 10        # Seconds between checks when internet is up
+    check_interval_online_max = 120   # Longest interval while the connection stays up
     check_interval_offline = 30       # Seconds between checks when internet is down
+    check_interval_offline_max = 300  # Longest interval while the connection stays down
 
     [GPIO]
     relay_pin = 17                    # GPIO pin number for relay control
@@ -143,34 +151,134 @@ LOG FILE:
 """
 
 import time
-import subprocess
 import logging
+import logging.handlers
+import atexit
 import signal
 import sys
 import threading
 import socket
 import argparse
-import configparser
+import collections
 import os
+import hmac
 import base64
-import ssl
 import random
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from queue import Queue
-import RPi.GPIO as GPIO
+import re
+from dataclasses import dataclass, fields
+from typing import Optional
+from html import escape
+import gzip
+import select
+import struct
+import ssl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from queue import Queue, SimpleQueue, Empty, Full
+
+# RPi.GPIO, configparser and subprocess are only needed on some code paths, so
+# they are imported inside the functions that use them and --help doesn't load
+# them. (ssl and base64 are loaded by http.server anyway.)
 
 # Default configuration file path
 DEFAULT_CONFIG_FILE = 'router-rebooter.conf'
 
-# Global event queue for communication between web server and main loop
-reboot_queue = Queue()
+# Number of log records buffered in memory before they are written to the
+# log file (warnings and errors are always written immediately)
+LOG_FILE_BUFFER_CAPACITY = 64
+
+# Number of log lines shown on the web page, and how much of the log file
+# tail is read to find them
+LOG_TAIL_LINES = 1000
+LOG_TAIL_BYTES = 256 * 1024
+
+# Log lines start with "YYYY-MM-DD HH:MM:SS - LEVEL - ", so the level name
+# always follows the 19 character timestamp
+LOG_LINE_PATTERN = re.compile(r'^.{19} - (INFO|WARNING|ERROR) - .*$', re.MULTILINE)
+
+# CSS classes used to color log lines on the web page, by log level
+LOG_LEVEL_CLASSES = {
+    'INFO': 'info',
+    'WARNING': 'warning',
+    'ERROR': 'error'
+}
+
+# Maximum number of connections the web interface serves at once
+MAX_HTTP_CONNECTIONS = 8
+
+# Largest POST body the web interface reads; its forms don't send one at all
+MAX_REQUEST_BODY = 4096
+
+# Global event queue for communication between web server and main loop.
+# It holds at most one request, so repeated clicks coalesce into one reboot.
+reboot_queue = Queue(maxsize=1)
+
+# How long get_local_ip() reuses a previously determined address, in seconds
+LOCAL_IP_CACHE_TTL = 300
+
+# Last address found by get_local_ip(), as (ip, time.monotonic() timestamp)
+local_ip_cache = None
+local_ip_lock = threading.Lock()
+
+# Last page built by generate_log_page(), as (log buffer version, variants),
+# where variants maps "gzipped" to that variant's (ETag, page parts)
+log_page_cache = None
+log_page_lock = threading.Lock()
+
+@dataclass(frozen=True, repr=False)
+class Config:
+    """Settings loaded from the configuration file."""
+    __slots__ = (
+        'ping_hosts', 'ping_retries', 'ping_timeout', 'ping_packet_size',
+        'tcp_check_port', 'check_interval_online', 'check_interval_online_max',
+        'check_interval_offline', 'check_interval_offline_max', 'relay_pin',
+        'http_port', 'http_auth_username', 'http_auth_password', 'http_auth_header',
+        'ssl_enabled', 'ssl_cert', 'ssl_key', 'log_file', 'log_level', 'config_path'
+    )
+
+    ping_hosts: tuple
+    ping_retries: int
+    ping_timeout: int
+    ping_packet_size: int
+    tcp_check_port: int
+    check_interval_online: int
+    check_interval_online_max: int
+    check_interval_offline: int
+    check_interval_offline_max: int
+    relay_pin: int
+    http_port: int
+    http_auth_username: str
+    http_auth_password: str
+    http_auth_header: Optional[bytes]
+    ssl_enabled: bool
+    ssl_cert: str
+    ssl_key: str
+    log_file: str
+    log_level: str
+    config_path: str
+
+    def __repr__(self):
+        # Leave the credentials out so they can't end up in a log
+        shown = ', '.join(f'{f.name}={getattr(self, f.name)!r}' for f in fields(self)
+                          if f.name not in ('http_auth_password', 'http_auth_header'))
+        return f'Config({shown})'
+
+# Labels of the gpiod chips that drive the 40-pin header: Raspberry Pi 5,
+# Raspberry Pi 4, and earlier models
+HEADER_GPIO_CHIP_LABELS = ('pinctrl-rp1', 'pinctrl-bcm2711', 'pinctrl-bcm2835')
+
+# RPi.GPIO module, or the gpiod line request driving the relay when libgpiod
+# is available (set up by setup_gpio)
+GPIO = None
+relay_line = None
 
 # Global configuration (will be loaded from config file in main)
 # Declared here for reference by functions
-config = {}
+config = None
 
 def create_default_config(config_path):
     """Create a default configuration file and exit."""
+    import configparser
+
     if os.path.exists(config_path):
         print(f"Error: Configuration file already exists: {config_path}")
         print("Remove it first or specify a different path.")
@@ -188,8 +296,11 @@ def create_default_config(config_path):
         'ping_retries': '5',
         'ping_timeout': '2',
         'ping_packet_size': '0',
+        'tcp_check_port': '53',
         'check_interval_online': '10',
-        'check_interval_offline': '30'
+        'check_interval_online_max': '120',
+        'check_interval_offline': '30',
+        'check_interval_offline_max': '300'
     }
 
     parser['GPIO'] = {
@@ -218,6 +329,8 @@ def create_default_config(config_path):
 
 def load_config(config_path):
     """Load configuration from file."""
+    import configparser
+
     if not os.path.exists(config_path):
         print(f"Error: Configuration file not found: {config_path}")
         print(f"\nCreate a default configuration file with:")
@@ -235,18 +348,37 @@ def load_config(config_path):
         print("Error: ping_hosts is empty. At least one host must be specified.")
         sys.exit(1)
 
-    # Load configuration into global dict
+    # Precompute the expected Basic Auth header (None disables authentication)
+    auth_username = parser.get('HTTP', 'auth_username', fallback='')
+    auth_password = parser.get('HTTP', 'auth_password', fallback='')
+    if auth_username and auth_password:
+        credentials = base64.b64encode(f"{auth_username}:{auth_password}".encode('utf-8'))
+        http_auth_header = b'Basic ' + credentials
+    else:
+        http_auth_header = None
+
+    check_interval_online = parser.getint('Network', 'check_interval_online')
+    check_interval_offline = parser.getint('Network', 'check_interval_offline')
+
+    # Load configuration into an immutable Config instance
     cfg = {
-        'ping_hosts': ping_hosts,
+        'ping_hosts': tuple(ping_hosts),
         'ping_retries': parser.getint('Network', 'ping_retries'),
         'ping_timeout': parser.getint('Network', 'ping_timeout', fallback=2),
         'ping_packet_size': parser.getint('Network', 'ping_packet_size', fallback=0),
-        'check_interval_online': parser.getint('Network', 'check_interval_online'),
-        'check_interval_offline': parser.getint('Network', 'check_interval_offline'),
+        # Off for config files written before the TCP check existed
+        'tcp_check_port': parser.getint('Network', 'tcp_check_port', fallback=0),
+        'check_interval_online': check_interval_online,
+        'check_interval_online_max': max(check_interval_online,
+                                         parser.getint('Network', 'check_interval_online_max', fallback=120)),
+        'check_interval_offline': check_interval_offline,
+        'check_interval_offline_max': max(check_interval_offline,
+                                          parser.getint('Network', 'check_interval_offline_max', fallback=300)),
         'relay_pin': parser.getint('GPIO', 'relay_pin'),
         'http_port': parser.getint('HTTP', 'port'),
-        'http_auth_username': parser.get('HTTP', 'auth_username', fallback=''),
-        'http_auth_password': parser.get('HTTP', 'auth_password', fallback=''),
+        'http_auth_username': auth_username,
+        'http_auth_password': auth_password,
+        'http_auth_header': http_auth_header,
         'ssl_enabled': parser.getboolean('HTTP', 'ssl_enabled', fallback=False),
         'ssl_cert': parser.get('HTTP', 'ssl_cert', fallback='cert.pem'),
         'ssl_key': parser.get('HTTP', 'ssl_key', fallback='key.pem'),
@@ -255,222 +387,287 @@ def load_config(config_path):
         'config_path': config_path
     }
 
-    return cfg
+    return Config(**cfg)
 
 # Logger will be configured after loading config
 logger = logging.getLogger(__name__)
 
-def setup_logging(log_file, log_level):
-    """Configure logging after config is loaded."""
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.FileHandler(log_file, mode='a'),
-            logging.StreamHandler()
-        ],
-        force=True  # Reconfigure if already configured
-    )
+# Handler writing the log file, and the buffer that batches records for it
+# (both created in setup_logging)
+log_file_handler = None
+log_memory_handler = None
 
-def setup_gpio(relay_pin):
-    """Configure GPIO after config is loaded."""
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(relay_pin, GPIO.OUT, initial=GPIO.LOW)
+# Recent log lines for the web interface (created in setup_logging)
+log_buffer_handler = None
 
-class LogViewerHandler(BaseHTTPRequestHandler):
-    """HTTP request handler for viewing logs."""
+# Background thread that writes queued log records (started in setup_logging)
+log_listener = None
 
-    def log_message(self, format, *args):
-        """Suppress default HTTP server logging."""
-        pass
-
-    def check_auth(self):
-        """Check HTTP Basic Authentication if enabled."""
-        # If no auth configured, allow access
-        if not config.get('http_auth_username') or not config.get('http_auth_password'):
-            return True
+def colorize_logs(log_content):
+    """Add color classes to log lines based on level."""
+    # Escape everything at once, then wrap all matching lines in one pass
+    return LOG_LINE_PATTERN.sub(
+        lambda m: f'<span class="{LOG_LEVEL_CLASSES[m.group(1)]}">{m.group(0)}</span>',
+        escape(log_content, quote=False)
+    )
 
-        # Get Authorization header
-        auth_header = self.headers.get('Authorization')
-        if not auth_header:
-            return False
+class ColorizingRingHandler(logging.Handler):
+    """Logging handler that keeps the most recent log lines as colorized HTML.
 
-        # Parse Basic Auth
-        try:
-            auth_type, auth_string = auth_header.split(' ', 1)
-            if auth_type.lower() != 'basic':
-                return False
+    Each record is escaped, wrapped in its color class and encoded once, when
+    it is logged, so the web interface only has to join the stored bytes. The
+    version counter changes whenever the buffer does.
+    """
 
-            # Decode base64 credentials
-            decoded = base64.b64decode(auth_string).decode('utf-8')
-            username, password = decoded.split(':', 1)
+    def __init__(self, maxlen=LOG_TAIL_LINES):
+        super().__init__()
+        self.buffer = collections.deque(maxlen=maxlen)
+        self.truncated = False
+        self.version = 0
 
-            # Check credentials
-            return (username == config['http_auth_username'] and
-                    password == config['http_auth_password'])
+    def emit(self, record):
+        try:
+            lines = escape(self.format(record), quote=False).split('\n')
+            css_class = LOG_LEVEL_CLASSES.get(record.levelname)
+            if css_class:
+                lines = [f'<span class="{css_class}">{line}</span>' for line in lines]
+            self.add_lines(lines)
         except Exception:
-            return False
-
-    def send_auth_required(self):
-        """Send 401 Unauthorized response."""
-        self.send_response(401)
-        self.send_header('WWW-Authenticate', 'Basic realm="Router Rebooter"')
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(b'<html><body><h1>401 Unauthorized</h1><p>Authentication required.</p></body></html>')
+            self.handleError(record)
 
-    def do_GET(self):
-        """Handle GET requests."""
-        # Check authentication
-        if not self.check_auth():
-            self.send_auth_required()
-            return
+    def add_lines(self, lines):
+        """Append already colorized lines, dropping the oldest when full."""
+        encoded = [line.encode() for line in lines]
+        self.acquire()
+        try:
+            if len(self.buffer) + len(encoded) > self.buffer.maxlen:
+                self.truncated = True
+            self.buffer.extend(encoded)
+            self.version += 1
+        finally:
+            self.release()
+
+    def snapshot(self):
+        """Return a copy of the buffered lines (as bytes), whether older lines
+        were dropped, and the buffer version."""
+        self.acquire()
+        try:
+            return list(self.buffer), self.truncated, self.version
+        finally:
+            self.release()
 
-        if self.path == '/' or self.path == '/logs':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
+    def clear(self):
+        """Discard all buffered lines."""
+        self.acquire()
+        try:
+            self.buffer.clear()
+            self.truncated = False
+            self.version += 1
+        finally:
+            self.release()
+
+class BatchedFileHandler(logging.handlers.MemoryHandler):
+    """Memory handler that writes its buffered records to a file handler in one go.
+
+    The records of a batch are formatted into a single write followed by one
+    flush, instead of the write and flush per record a plain MemoryHandler
+    causes on its target.
+    """
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.target and self.buffer:
+                target = self.target
+                target.acquire()
+                try:
+                    if target.stream is None:
+                        target.stream = target._open()
+                    target.stream.write(''.join(
+                        target.format(record) + target.terminator for record in self.buffer
+                    ))
+                    target.stream.flush()
+                except Exception:
+                    target.handleError(self.buffer[-1])
+                finally:
+                    target.release()
+                self.buffer.clear()
+        finally:
+            self.release()
 
-            html = self.generate_log_page()
-            self.wfile.write(html.encode())
-        elif self.path == '/raw':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
+def setup_logging(log_file, log_level):
+    """Configure logging after config is loaded."""
+    global log_file_handler, log_memory_handler, log_buffer_handler, log_listener
+    log_buffer_handler = ColorizingRingHandler()
 
-            try:
-                with open(config['log_file'], 'r') as f:
-                    self.wfile.write(f.read().encode())
-            except FileNotFoundError:
-                self.wfile.write(b"Log file not found.")
-        else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"404 - Not Found")
+    # Seed the web interface with the end of the existing log file
+    try:
+        lines, truncated = read_log_tail(log_file)
+        if lines:
+            log_buffer_handler.add_lines(colorize_logs('\n'.join(lines)).split('\n'))
+        log_buffer_handler.truncated = truncated
+    except FileNotFoundError:
+        pass
 
-    def do_POST(self):
-        """Handle POST requests."""
-        # Check authentication
-        if not self.check_auth():
-            self.send_auth_required()
-            return
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s',
+                                  datefmt='%Y-%m-%d %H:%M:%S')
+    log_file_handler = logging.FileHandler(log_file, mode='a')
+    log_file_handler.setFormatter(formatter)
+
+    # Batch file writes to spare the SD card; warnings and errors (such as a
+    # detected outage) are written immediately
+    log_memory_handler = BatchedFileHandler(
+        LOG_FILE_BUFFER_CAPACITY,
+        flushLevel=logging.WARNING,
+        target=log_file_handler,
+        flushOnClose=True
+    )
 
-        if self.path == '/reboot':
-            # Queue a reboot request
-            reboot_queue.put('manual_reboot')
-            logger.info("Manual reboot requested via web interface")
+    log_buffer_handler.setFormatter(formatter)
+    handlers = [log_memory_handler, log_buffer_handler]
 
-            # Send response
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
+    # Under systemd, stderr goes to the journal, which would only duplicate
+    # the log file; send records to the journal directly if python-systemd
+    # is installed (it timestamps them itself), otherwise leave it out
+    if stderr_is_journal():
+        try:
+            from systemd.journal import JournalHandler
+            handlers.append(JournalHandler(SYSLOG_IDENTIFIER='router-rebooter'))
+        except ImportError:
+            pass
+    else:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    # Log calls only enqueue the record; a background thread does the I/O.
+    # SimpleQueue.put is reentrant, so the signal handler can log (and stop
+    # the listener) even if it interrupts a log call in the main thread.
+    log_queue = SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, log_level.upper()))
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    log_listener.start()
+    atexit.register(stop_logging)
+
+def stderr_is_journal():
+    """Check whether stderr is connected to the systemd journal."""
+    # systemd sets JOURNAL_STREAM to the device and inode of the journal stream
+    journal_stream = os.environ.get('JOURNAL_STREAM')
+    if not journal_stream:
+        return False
+    try:
+        st = os.fstat(sys.stderr.fileno())
+    except (AttributeError, ValueError, OSError):
+        return False
+    return journal_stream == f"{st.st_dev}:{st.st_ino}"
+
+def stop_logging():
+    """Write out any queued log records and stop the logging thread."""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+        log_memory_handler.flush()
+
+def read_log_tail(log_file, max_lines=LOG_TAIL_LINES, max_bytes=LOG_TAIL_BYTES):
+    """Return the last lines of the log file and whether older lines were omitted.
+
+    Only the final max_bytes of the file are read, so the cost does not grow
+    with the size of the log.
+    """
+    with open(log_file, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        start = max(0, size - max_bytes)
+        f.seek(start)
+        chunk = f.read().decode('utf-8', errors='replace')
+
+    lines = chunk.split('\n')
+    if lines[-1] == '':
+        lines.pop()  # Nothing follows the final newline
+    truncated = start > 0
+    if truncated:
+        lines = lines[1:]  # Discard the partial first line
+    if len(lines) > max_lines:
+        lines = lines[-max_lines:]
+        truncated = True
+    return lines, truncated
+
+def find_header_gpio_chip(gpiod):
+    """Return the gpiod chip wired to the 40-pin header, or None if there isn't one."""
+    # The header's chip number differs between models and kernels, so match
+    # on the driver label instead
+    for chip in gpiod.ChipIter():
+        if chip.label() in HEADER_GPIO_CHIP_LABELS:
+            return chip
+        chip.close()
+    return None
 
-            html = """<!DOCTYPE html>
-<html>
-<head>
-    <title>Reboot Requested</title>
-    <meta charset="utf-8">
-    <meta http-equiv="refresh" content="3;url=/">
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            background-color: #1e1e1e;
-            color: #d4d4d4;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            height: 100vh;
-            margin: 0;
-        }
-        .message {
-            text-align: center;
-            padding: 40px;
-            background-color: #252526;
-            border-radius: 10px;
-            border: 2px solid #0e639c;
-        }
-        h1 { color: #4ec9b0; }
-        p { font-size: 18px; }
-    </style>
-</head>
-<body>
-    <div class="message">
-        <h1>✅ Router Reboot Requested</h1>
-        <p>The router will be rebooted shortly...</p>
-        <p><small>Redirecting to logs in 3 seconds...</small></p>
-    </div>
-</body>
-</html>"""
-            self.wfile.write(html.encode())
-        elif self.path == '/clear-log':
-            # Clear the log file
-            try:
-                with open(config['log_file'], 'w') as f:
-                    f.write('')
-                logger.info("Log file cleared via web interface")
+def setup_gpio(relay_pin):
+    """Configure GPIO after config is loaded."""
+    global GPIO, relay_line
 
-                # Send simple success response
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(b"OK")
-            except Exception as e:
-                logger.error(f"Error clearing log file: {e}")
-                self.send_response(500)
-                self.send_header('Content-type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(f"Error: {e}".encode())
+    # Prefer a libgpiod line request that stays open for the whole run, so
+    # toggling the relay is a single ioctl; fall back to RPi.GPIO where the
+    # gpiod bindings (v1 API) aren't installed or can't open the header's chip
+    try:
+        import gpiod
+        chip = find_header_gpio_chip(gpiod)
+        if chip is None:
+            logger.info("No GPIO header chip found via libgpiod")
         else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"404 - Not Found")
+            line = chip.get_line(relay_pin)
+            line.request(consumer='router-rebooter', type=gpiod.LINE_REQ_DIR_OUT, default_vals=[0])
+            relay_line = line
+            logger.info(f"Relay on GPIO {relay_pin} driven through libgpiod ({chip.label()})")
+            return
+    except ImportError:
+        pass
+    except (AttributeError, OSError) as e:
+        logger.info(f"libgpiod not usable ({e})")
 
-    def generate_log_page(self):
-        """Generate HTML page with log content."""
-        try:
-            with open(config['log_file'], 'r') as f:
-                log_content = f.read()
-        except FileNotFoundError:
-            log_content = "Log file not found."
+    import RPi.GPIO as GPIO
 
-        # Get last 1000 lines to avoid huge pages
-        lines = log_content.split('\n')
-        if len(lines) > 1000:
-            log_content = '\n'.join(lines[-1000:])
-            truncated_msg = f"(Showing last 1000 lines of {len(lines)} total)\n\n"
-        else:
-            truncated_msg = ""
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(relay_pin, GPIO.OUT, initial=GPIO.LOW)
+    logger.info(f"Relay on GPIO {relay_pin} driven through RPi.GPIO")
+
+def minify_html(text):
+    """Strip indentation and blank lines from an HTML template."""
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
 
-        html = f"""<!DOCTYPE html>
+# Static parts of the log page, encoded once at import. Only the truncation
+# notice and the log lines between them change per request.
+LOG_PAGE_PREFIX = minify_html("""<!DOCTYPE html>
 <html>
 <head>
     <title>Router Rebooter Logs</title>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1">
     <style>
-        body {{
+        body {
             font-family: 'Courier New', monospace;
             margin: 0;
             padding: 20px;
             background-color: #1e1e1e;
             color: #d4d4d4;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #4ec9b0;
             margin-bottom: 10px;
-        }}
-        .controls {{
+        }
+        .controls {
             margin-bottom: 20px;
             padding: 10px;
             background-color: #252526;
             border-radius: 5px;
-        }}
-        .controls button {{
+        }
+        .controls button {
             background-color: #0e639c;
             color: white;
             border: none;
@@ -479,23 +676,23 @@ class LogViewerHandler(BaseHTTPRequestHandler):
             cursor: pointer;
             border-radius: 3px;
             font-size: 14px;
-        }}
-        .controls button:hover {{
+        }
+        .controls button:hover {
             background-color: #1177bb;
-        }}
-        .controls button.reboot {{
+        }
+        .controls button.reboot {
             background-color: #d9534f;
-        }}
-        .controls button.reboot:hover {{
+        }
+        .controls button.reboot:hover {
             background-color: #c9302c;
-        }}
-        .controls button.clear {{
+        }
+        .controls button.clear {
             background-color: #f0ad4e;
-        }}
-        .controls button.clear:hover {{
+        }
+        .controls button.clear:hover {
             background-color: #ec971f;
-        }}
-        .log-box {{
+        }
+        .log-box {
             background-color: #252526;
             border: 1px solid #3e3e42;
             border-radius: 5px;
@@ -506,64 +703,64 @@ class LogViewerHandler(BaseHTTPRequestHandler):
             line-height: 1.5;
             max-height: 80vh;
             overflow-y: auto;
-        }}
-        .warning {{
+        }
+        .warning {
             color: #dcdcaa;
-        }}
-        .info {{
+        }
+        .info {
             color: #4ec9b0;
-        }}
-        .error {{
+        }
+        .error {
             color: #f48771;
-        }}
-        .truncated {{
+        }
+        .truncated {
             color: #ce9178;
             font-style: italic;
             margin-bottom: 10px;
-        }}
+        }
     </style>
     <script>
-        function refreshPage() {{
+        function refreshPage() {
             location.reload();
-        }}
-        function scrollToBottom() {{
+        }
+        function scrollToBottom() {
             var logBox = document.getElementById('logBox');
             logBox.scrollTop = logBox.scrollHeight;
-        }}
-        function rebootRouter() {{
-            if (confirm('Are you sure you want to reboot the router?')) {{
-                fetch('/reboot', {{
+        }
+        function rebootRouter() {
+            if (confirm('Are you sure you want to reboot the router?')) {
+                fetch('/reboot', {
                     method: 'POST'
-                }})
+                })
                 .then(response => response.text())
-                .then(html => {{
+                .then(html => {
                     document.body.innerHTML = html;
-                }})
-                .catch(error => {{
+                })
+                .catch(error => {
                     alert('Error requesting reboot: ' + error);
-                }});
-            }}
-        }}
-        function clearLog() {{
-            if (confirm('Are you sure you want to clear the log file? This cannot be undone.')) {{
-                fetch('/clear-log', {{
+                });
+            }
+        }
+        function clearLog() {
+            if (confirm('Are you sure you want to clear the log file? This cannot be undone.')) {
+                fetch('/clear-log', {
                     method: 'POST'
-                }})
-                .then(response => {{
-                    if (response.ok) {{
+                })
+                .then(response => {
+                    if (response.ok) {
                         location.reload();  // Just reload the page to show empty log
-                    }} else {{
+                    } else {
                         alert('Error clearing log');
-                    }}
-                }})
-                .catch(error => {{
+                    }
+                })
+                .catch(error => {
                     alert('Error clearing log: ' + error);
-                }});
-            }}
-        }}
-        window.onload = function() {{
+                });
+            }
+        }
+        window.onload = function() {
             scrollToBottom();
-        }};
+        };
     </script>
 </head>
 <body>
@@ -576,34 +773,386 @@ class LogViewerHandler(BaseHTTPRequestHandler):
             <button class="reboot" onclick="rebootRouter()">🔌 Reboot Router</button>
             <button class="clear" onclick="clearLog()">🗑️ Clear Log</button>
         </div>
-        <div class="truncated">{truncated_msg}</div>
-        <div class="log-box" id="logBox">{self.colorize_logs(log_content)}</div>
+""").encode()
+
+LOG_PAGE_HEADER = """<div class="truncated">{truncated_msg}</div>
+<div class="log-box" id="logBox">"""
+
+LOG_PAGE_SUFFIX = minify_html("""</div>
     </div>
 </body>
-</html>"""
-        return html
-
-    def colorize_logs(self, log_content):
-        """Add color classes to log lines based on level."""
-        lines = log_content.split('\n')
-        colored_lines = []
-        for line in lines:
-            if ' - WARNING - ' in line:
-                colored_lines.append(f'<span class="warning">{self.escape_html(line)}</span>')
-            elif ' - ERROR - ' in line:
-                colored_lines.append(f'<span class="error">{self.escape_html(line)}</span>')
-            elif ' - INFO - ' in line:
-                colored_lines.append(f'<span class="info">{self.escape_html(line)}</span>')
-            else:
-                colored_lines.append(self.escape_html(line))
-        return '\n'.join(colored_lines)
+</html>""").encode()
 
-    def escape_html(self, text):
-        """Escape HTML special characters."""
-        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+# Confirmation page for manual reboot requests, also stored pre-compressed
+REBOOT_PAGE = minify_html("""<!DOCTYPE html>
+<html>
+<head>
+    <title>Reboot Requested</title>
+    <meta charset="utf-8">
+    <meta http-equiv="refresh" content="3;url=/">
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            background-color: #1e1e1e;
+            color: #d4d4d4;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            height: 100vh;
+            margin: 0;
+        }
+        .message {
+            text-align: center;
+            padding: 40px;
+            background-color: #252526;
+            border-radius: 10px;
+            border: 2px solid #0e639c;
+        }
+        h1 { color: #4ec9b0; }
+        p { font-size: 18px; }
+    </style>
+</head>
+<body>
+    <div class="message">
+        <h1>✅ Router Reboot Requested</h1>
+        <p>The router will be rebooted shortly...</p>
+        <p><small>Redirecting to logs in 3 seconds...</small></p>
+    </div>
+</body>
+</html>""").encode()
+REBOOT_PAGE_GZIP = gzip.compress(REBOOT_PAGE, 9)
+
+# Log page ETags combine this per-run token with the log buffer version, which
+# starts from zero again after a restart
+LOG_PAGE_ETAG_TOKEN = f'{random.getrandbits(32):08x}'
+
+# Fixed bodies of the remaining responses
+AUTH_REQUIRED_PAGE = b'<html><body><h1>401 Unauthorized</h1><p>Authentication required.</p></body></html>'
+NOT_FOUND_BODY = b"404 - Not Found"
+LOG_NOT_FOUND_BODY = b"Log file not found."
+OK_BODY = b"OK"
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """Threading HTTP server that serves at most MAX_HTTP_CONNECTIONS connections at once.
+
+    Further connections wait in the listen backlog until a handler thread
+    finishes, instead of each getting a thread of its own.
+    """
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection_slots = threading.BoundedSemaphore(MAX_HTTP_CONNECTIONS)
+
+    def process_request(self, request, client_address):
+        self.connection_slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self.connection_slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.connection_slots.release()
+
+class LogViewerHandler(BaseHTTPRequestHandler):
+    """HTTP request handler for viewing logs."""
+
+    # Keep connections open between requests so periodic refreshes reuse the
+    # same connection and handler thread. Every response must therefore send
+    # a Content-Length. Idle connections are closed after the timeout.
+    protocol_version = 'HTTP/1.1'
+    timeout = 10
+
+    # Headers and body go out in separate writes; without TCP_NODELAY the body
+    # waits for the client's delayed ACK on a reused connection (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Suppress default HTTP server logging."""
+        pass
+
+    def check_auth(self):
+        """Check HTTP Basic Authentication if enabled."""
+        # If no auth configured, allow access
+        expected = config.http_auth_header
+        if not expected:
+            return True
+
+        # Compare the raw header in constant time to avoid leaking timing information
+        auth_header = self.headers.get('Authorization', '').encode('latin-1')
+        return hmac.compare_digest(auth_header, expected)
+
+    def accepts_gzip(self):
+        """Check whether the client accepts gzip-compressed responses."""
+        return 'gzip' in self.headers.get('Accept-Encoding', '')
+
+    def send_auth_required(self):
+        """Send 401 Unauthorized response."""
+        self.send_response(401)
+        self.send_header('WWW-Authenticate', 'Basic realm="Router Rebooter"')
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(len(AUTH_REQUIRED_PAGE)))
+        self.end_headers()
+        self.wfile.write(AUTH_REQUIRED_PAGE)
+
+    def do_GET(self):
+        """Handle GET requests."""
+        # Check authentication
+        if not self.check_auth():
+            self.send_auth_required()
+            return
+
+        self.GET_ROUTES.get(self.path, LogViewerHandler.send_not_found)(self)
+
+    def do_POST(self):
+        """Handle POST requests."""
+        # Check authentication before reading anything the client sent
+        if not self.check_auth():
+            # An unread body would be parsed as the next request
+            if self.headers.get('Content-Length', '0') != '0' or 'Transfer-Encoding' in self.headers:
+                self.close_connection = True
+            self.send_auth_required()
+            return
+
+        # Discard any request body so it isn't read as the next request
+        if not self.discard_body():
+            return
+
+        self.POST_ROUTES.get(self.path, LogViewerHandler.send_not_found)(self)
+
+    def discard_body(self):
+        """Read and drop a small request body.
+
+        Returns False after sending an error (which closes the connection)
+        if the body is chunked, larger than MAX_REQUEST_BODY or has an
+        invalid Content-Length.
+        """
+        if 'Transfer-Encoding' in self.headers:
+            self.send_error(411)
+            return False
+
+        length = self.headers.get('Content-Length', '0')
+        if not (length.isascii() and length.isdigit()):
+            self.send_error(400, "Invalid Content-Length")
+            return False
+        length = int(length)
+        if length > MAX_REQUEST_BODY:
+            self.send_error(413)
+            return False
+
+        while length:
+            chunk = self.rfile.read(length)
+            if not chunk:
+                # Client closed the connection mid-body
+                self.close_connection = True
+                return False
+            length -= len(chunk)
+        return True
+
+    def send_not_found(self):
+        """Send 404 Not Found response."""
+        self.send_response(404)
+        self.send_header('Content-Length', str(len(NOT_FOUND_BODY)))
+        self.end_headers()
+        self.wfile.write(NOT_FOUND_BODY)
+
+    def serve_logs(self):
+        """Serve the log viewer page."""
+        gzipped = self.accepts_gzip()
+        etag, page = self.generate_log_page(gzipped)
+
+        # Nothing new has been logged since the browser's copy was sent
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(sum(len(part) for part in page)))
+        self.end_headers()
+
+        self.wfile.writelines(page)
+
+    def serve_raw(self):
+        """Serve the log file as plain text."""
+        # Write out buffered records so the raw log is up to date
+        log_memory_handler.flush()
+        try:
+            with open(config.log_file, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                self.send_response(200)
+                self.send_header('Content-type', 'text/plain')
+                self.send_header('Content-Length', str(size))
+                self.end_headers()
+
+                # socket.sendfile() uses zero-copy os.sendfile() where possible
+                # and falls back to plain sends (e.g. for SSL sockets)
+                sent = self.connection.sendfile(f, 0, size)
+                if sent < size:
+                    # The log was cleared while sending; the response is short
+                    # of its Content-Length, so the connection can't be reused
+                    self.close_connection = True
+        except FileNotFoundError:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain')
+            self.send_header('Content-Length', str(len(LOG_NOT_FOUND_BODY)))
+            self.end_headers()
+            self.wfile.write(LOG_NOT_FOUND_BODY)
+
+    def handle_reboot(self):
+        """Queue a manual reboot and confirm it."""
+        try:
+            reboot_queue.put_nowait('manual_reboot')
+            logger.info("Manual reboot requested via web interface")
+        except Full:
+            logger.info("Manual reboot requested via web interface (already pending)")
+
+        # Send response
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        if self.accepts_gzip():
+            body = REBOOT_PAGE_GZIP
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            body = REBOOT_PAGE
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_clear_log(self):
+        """Clear the log file and the web interface's log buffer."""
+        try:
+            # Truncate through the logging handler's own file descriptor
+            # so its stream and the file stay consistent. Buffered records
+            # are written out first so they are cleared too.
+            log_memory_handler.acquire()
+            log_file_handler.acquire()
+            try:
+                log_memory_handler.flush()
+                log_file_handler.flush()
+                os.ftruncate(log_file_handler.stream.fileno(), 0)
+                log_file_handler.stream.seek(0)
+            finally:
+                log_file_handler.release()
+                log_memory_handler.release()
+            log_buffer_handler.clear()
+            logger.info("Log file cleared via web interface")
+
+            # Send simple success response
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain')
+            self.send_header('Content-Length', str(len(OK_BODY)))
+            self.end_headers()
+            self.wfile.write(OK_BODY)
+        except Exception as e:
+            logger.error(f"Error clearing log file: {e}")
+            body = f"Error: {e}".encode()
+            self.send_response(500)
+            self.send_header('Content-type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def generate_log_page(self, gzipped=False):
+        """Generate HTML page with log content as an ETag and a list of byte strings.
+
+        The page is rebuilt only when new lines have been logged since the
+        last call, and compressed at most once per rebuild; refreshes in
+        between get the cached page.
+        """
+        global log_page_cache
+        with log_page_lock:
+            if log_page_cache is None or log_page_cache[0] != log_buffer_handler.version:
+                # Recent lines are colorized as they are logged
+                lines, truncated, version = log_buffer_handler.snapshot()
+                log_html = b'\n'.join(lines)
+
+                if truncated:
+                    truncated_msg = f"(Showing last {LOG_TAIL_LINES} lines)\n\n"
+                else:
+                    truncated_msg = ""
+
+                header = LOG_PAGE_HEADER.format(truncated_msg=truncated_msg)
+                page = [LOG_PAGE_PREFIX, header.encode(), log_html, LOG_PAGE_SUFFIX]
+                etag = f'"{LOG_PAGE_ETAG_TOKEN}-{version:x}"'
+                log_page_cache = (version, {False: (etag, page)})
+
+            variants = log_page_cache[1]
+            if gzipped and True not in variants:
+                etag, page = variants[False]
+                # The page changes with every logged line, so favour speed over
+                # ratio; the compressed variant needs an ETag of its own
+                variants[True] = (etag[:-1] + '-gzip"', [gzip.compress(b''.join(page), 1)])
+            return variants[gzipped]
+
+    # Request handlers by path
+    GET_ROUTES = {
+        '/': serve_logs,
+        '/logs': serve_logs,
+        '/raw': serve_raw
+    }
+    POST_ROUTES = {
+        '/reboot': handle_reboot,
+        '/clear-log': handle_clear_log
+    }
+
+def write_self_signed_cert(cert_file, key_file):
+    """Create a self-signed certificate and private key in-process with cryptography."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    import datetime
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'router-rebooter')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=365))
+        .sign(key, hashes.SHA256())
+    )
+
+    # The private key must not be readable by other users
+    key_fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(key_fd, 'wb') as f:
+        f.write(key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+    with open(cert_file, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
 
 def generate_self_signed_cert(cert_file, key_file):
-    """Generate a self-signed SSL certificate using openssl command."""
+    """Generate a self-signed SSL certificate.
+
+    Uses the cryptography package when it is installed, otherwise falls back
+    to the openssl command.
+    """
+    import subprocess
+
     try:
         # Check if files already exist
         if os.path.exists(cert_file) and os.path.exists(key_file):
@@ -612,6 +1161,13 @@ def generate_self_signed_cert(cert_file, key_file):
 
         logger.info("Generating self-signed SSL certificate...")
 
+        try:
+            write_self_signed_cert(cert_file, key_file)
+            logger.info(f"SSL certificate generated: {cert_file}")
+            return True
+        except ImportError:
+            logger.info("cryptography package not installed, using openssl command")
+
         # Generate self-signed certificate using openssl
         result = subprocess.run([
             'openssl', 'req', '-x509', '-newkey', 'rsa:2048',
@@ -629,7 +1185,7 @@ def generate_self_signed_cert(cert_file, key_file):
             logger.error(f"Failed to generate SSL certificate: {result.stderr}")
             return False
     except FileNotFoundError:
-        logger.error("openssl command not found. Install openssl to use SSL.")
+        logger.error("openssl command not found. Install the cryptography package or openssl to use SSL.")
         return False
     except Exception as e:
         logger.error(f"Error generating SSL certificate: {e}")
@@ -638,12 +1194,12 @@ def generate_self_signed_cert(cert_file, key_file):
 def create_http_server():
     """Create HTTP server instance (for error checking before threading)."""
     try:
-        server = HTTPServer(('0.0.0.0', config['http_port']), LogViewerHandler)
+        server = PooledHTTPServer(('0.0.0.0', config.http_port), LogViewerHandler)
 
         # Enable SSL if configured
-        if config.get('ssl_enabled'):
-            cert_file = config['ssl_cert']
-            key_file = config['ssl_key']
+        if config.ssl_enabled:
+            cert_file = config.ssl_cert
+            key_file = config.ssl_key
 
             # Generate certificate if it doesn't exist
             if not os.path.exists(cert_file) or not os.path.exists(key_file):
@@ -659,7 +1215,7 @@ def create_http_server():
 
         return server
     except OSError as e:
-        logger.error(f"Failed to start HTTP server on port {config['http_port']}: {e}")
+        logger.error(f"Failed to start HTTP server on port {config.http_port}: {e}")
         sys.exit(1)
     except Exception as e:
         logger.error(f"Unexpected error starting HTTP server: {e}")
@@ -667,86 +1223,274 @@ def create_http_server():
 
 def start_http_server(server):
     """Run HTTP server (called in background thread)."""
-    protocol = "HTTPS" if config.get('ssl_enabled') else "HTTP"
-    logger.info(f"{protocol} server started on port {config['http_port']}")
+    protocol = "HTTPS" if config.ssl_enabled else "HTTP"
+    logger.info(f"{protocol} server started on port {config.http_port}")
     server.serve_forever()
 
-def get_local_ip():
-    """Get the local IP address of the Raspberry Pi."""
-    try:
-        # Create a socket connection to determine local IP
-        # This doesn't actually send data, just determines routing
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
-        return local_ip
-    except Exception:
-        # Fallback: try to get from hostname
+def get_local_ip(max_age=LOCAL_IP_CACHE_TTL):
+    """Get the local IP address of the Raspberry Pi.
+
+    The address is cached for max_age seconds so repeated calls don't have to
+    redo the route lookup; it is refreshed periodically to follow DHCP changes.
+    """
+    global local_ip_cache
+    with local_ip_lock:
+        now = time.monotonic()
+        if local_ip_cache is not None and now - local_ip_cache[1] < max_age:
+            return local_ip_cache[0]
+
         try:
-            return socket.gethostbyname(socket.gethostname())
+            # Create a socket connection to determine local IP
+            # This doesn't actually send data, just determines routing
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(("8.8.8.8", 80))
+                local_ip = s.getsockname()[0]
+            local_ip_cache = (local_ip, now)
+            return local_ip
         except Exception:
-            return "localhost"
+            # Fallback: try to get from hostname (not cached, routing may come back)
+            try:
+                return socket.gethostbyname(socket.gethostname())
+            except Exception:
+                return "localhost"
 
 def cleanup_and_exit(signum=None, frame=None):
     """Clean up GPIO on exit."""
     logger.info("Shutting down router rebooter...")
-    GPIO.cleanup()
+    stop_logging()
+    if relay_line is not None:
+        relay_line.release()
+    elif GPIO is not None:
+        GPIO.cleanup()
     sys.exit(0)
 
 # Register signal handlers for clean shutdown
 signal.signal(signal.SIGINT, cleanup_and_exit)
 signal.signal(signal.SIGTERM, cleanup_and_exit)
 
+# ICMP message types used by the in-process pinger
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# Shared unprivileged ICMP socket (created on first use by get_icmp_socket).
+# icmp_lock serializes its creation and each batch of probes sent over it.
+icmp_socket = None
+icmp_lock = threading.Lock()
+icmp_available = True
+icmp_ident = os.getpid() & 0xFFFF
+icmp_sequence = 0
+
+def ones_complement_sum(data, total=0):
+    """Return the RFC 1071 16-bit one's-complement sum of data, added to total.
+
+    The data is summed 8 bytes at a time as 64-bit integers and folded down to
+    16 bits at the end, which gives the same result as adding 16-bit words.
+    """
+    if len(data) % 2:
+        data += b'\x00'
+    view = memoryview(data)
+    aligned = len(data) & ~7
+    for i in range(0, aligned, 8):
+        total += int.from_bytes(view[i:i + 8], 'big')
+    total += int.from_bytes(view[aligned:], 'big')
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total
+
+def icmp_checksum(header, payload_sum=0):
+    """Compute the ICMP checksum of header followed by a payload with the given sum."""
+    return ~ones_complement_sum(header, payload_sum) & 0xFFFF
+
+def get_icmp_socket():
+    """Return the shared ICMP socket, or None if unprivileged ICMP is not permitted."""
+    global icmp_socket, icmp_available
+    with icmp_lock:
+        if icmp_socket is None and icmp_available:
+            try:
+                icmp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            except PermissionError:
+                icmp_available = False
+                logger.warning("Unprivileged ICMP sockets are not permitted (check net.ipv4.ping_group_range). "
+                               "Falling back to the ping command.")
+        return icmp_socket
+
+def ping_icmp(sock, hosts, timeout, packet_size):
+    """Send one ICMP echo request to each host at once and count the replies.
+
+    All requests go out back to back with distinct sequence numbers, then
+    replies are collected until every probe has answered or timeout expires.
+    """
+    global icmp_sequence
+    payload = b'\x00' * packet_size
+    # The payload is the same for every probe, so only sum it once
+    payload_sum = ones_complement_sum(payload)
+    pending = set()
+
+    for host in hosts:
+        icmp_sequence = (icmp_sequence + 1) & 0xFFFF
+        header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, icmp_ident, icmp_sequence)
+        checksum = icmp_checksum(header, payload_sum)
+        packet = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, icmp_ident, icmp_sequence) + payload
+        try:
+            sock.sendto(packet, (host, 0))
+            pending.add(icmp_sequence)
+        except OSError as e:
+            logger.debug(f"ICMP echo to {host} failed: {e}")
+
+    # The kernel replaces the echo identifier with the socket's local port
+    # and only delivers replies carrying it, but check it anyway
+    ident = sock.getsockname()[1]
+
+    received = 0
+    deadline = time.monotonic() + timeout
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        readable, _, _ = select.select([sock], [], [], remaining)
+        if not readable:
+            break
+        try:
+            reply, _ = sock.recvfrom(1024)
+        except OSError as e:
+            # ICMP errors (e.g. host unreachable) are reported on receive
+            logger.debug(f"ICMP receive error: {e}")
+            continue
+        # Ignore stray replies and late replies to earlier checks
+        if len(reply) >= 8 and reply[0] == ICMP_ECHO_REPLY:
+            reply_ident, sequence = struct.unpack('!HH', reply[4:8])
+            if reply_ident == ident and sequence in pending:
+                pending.remove(sequence)
+                received += 1
+    return received
+
+# Smoothed TCP connect time in seconds (None until the first success), used to
+# shorten the connect timeout on a healthy link
+tcp_connect_time = None
+
+# Shortest connect timeout check_tcp() adapts down to, in seconds
+TCP_CHECK_MIN_TIMEOUT = 0.5
+
+def check_tcp(host, port, timeout):
+    """Try a TCP connection to host:port and return whether it succeeded.
+
+    The timeout is cut to a few times the recent average connect time, so a
+    dead link falls through to the ping check without waiting the full timeout.
+    """
+    global tcp_connect_time
+    if tcp_connect_time is not None:
+        timeout = min(timeout, max(TCP_CHECK_MIN_TIMEOUT, 4 * tcp_connect_time))
+
+    started = time.monotonic()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+    except OSError as e:
+        logger.debug(f"TCP connect to {host}:{port} failed: {e}")
+        return False
+
+    elapsed = time.monotonic() - started
+    if tcp_connect_time is None:
+        tcp_connect_time = elapsed
+    else:
+        tcp_connect_time += (elapsed - tcp_connect_time) / 8
+    return True
+
+def ping_subprocess(host, timeout, packet_size):
+    """Ping host once using the system ping command."""
+    import subprocess
+
+    result = subprocess.run(
+        ["ping", "-c1", f"-W{timeout}", f"-s{packet_size}", host],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    return result.returncode == 0
+
 def check_internet():
-    """Check if internet is available by pinging randomly selected hosts with retries."""
-    hosts = config['ping_hosts']
-    retries = config['ping_retries']
-    timeout = config['ping_timeout']
-    packet_size = config['ping_packet_size']
+    """Check if internet is available by pinging randomly selected hosts with retries.
+
+    A TCP connection to one of the hosts is tried first when tcp_check_port
+    is set; a completed handshake is enough and skips the pings.
+    """
+    hosts = config.ping_hosts
+    retries = config.ping_retries
+    timeout = config.ping_timeout
+    packet_size = config.ping_packet_size
     failed_attempts = 0
     pinged_hosts = []  # Track which hosts were pinged
 
-    for attempt in range(retries):
-        # Randomly select a host for this attempt
+    if config.tcp_check_port:
         host = random.choice(hosts)
-        pinged_hosts.append(host)
-        logger.debug(f"Ping attempt {attempt + 1}/{retries}: selected target {host}")
+        if check_tcp(host, config.tcp_check_port, timeout):
+            logger.debug(f"TCP connect to {host}:{config.tcp_check_port} succeeded")
+            return True
+
+    sock = get_icmp_socket()
+
+    if sock is not None:
+        # Send all probes at once, each to a randomly selected host
+        pinged_hosts = [random.choice(hosts) for _ in range(retries)]
+        logger.debug(f"Pinging [{', '.join(pinged_hosts)}]")
 
         try:
-            result = subprocess.run(
-                ["ping", "-c1", f"-W{timeout}", f"-s{packet_size}", host],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
-            if result.returncode == 0:
-                # Report packet loss if there were any failures before success
-                if failed_attempts > 0:
-                    loss_percent = (failed_attempts / (attempt + 1)) * 100
-                    hosts_str = ', '.join(pinged_hosts)
-                    logger.warning(f"Packet loss detected to [{hosts_str}]: {failed_attempts}/{attempt + 1} packets lost ({loss_percent:.1f}%)")
-                return True  # Success - internet is up
-            else:
-                failed_attempts += 1
+            with icmp_lock:
+                received = ping_icmp(sock, pinged_hosts, timeout, packet_size)
         except Exception as e:
-            failed_attempts += 1
-            logger.error(f"Error checking internet via {host} (attempt {attempt + 1}/{retries}): {e}")
+            received = 0
+            logger.error(f"Error checking internet via [{', '.join(pinged_hosts)}]: {e}")
+        failed_attempts = retries - received
+
+        if received > 0:
+            # Report packet loss if some probes went unanswered
+            if failed_attempts > 0:
+                loss_percent = (failed_attempts / retries) * 100
+                hosts_str = ', '.join(pinged_hosts)
+                logger.warning(f"Packet loss detected to [{hosts_str}]: {failed_attempts}/{retries} packets lost ({loss_percent:.1f}%)")
+            return True  # Success - internet is up
+    else:
+        for attempt in range(retries):
+            # Randomly select a host for this attempt
+            host = random.choice(hosts)
+            pinged_hosts.append(host)
+            logger.debug(f"Ping attempt {attempt + 1}/{retries}: selected target {host}")
+
+            try:
+                if ping_subprocess(host, timeout, packet_size):
+                    # Report packet loss if there were any failures before success
+                    if failed_attempts > 0:
+                        loss_percent = (failed_attempts / (attempt + 1)) * 100
+                        hosts_str = ', '.join(pinged_hosts)
+                        logger.warning(f"Packet loss detected to [{hosts_str}]: {failed_attempts}/{attempt + 1} packets lost ({loss_percent:.1f}%)")
+                    return True  # Success - internet is up
+                else:
+                    failed_attempts += 1
+            except Exception as e:
+                failed_attempts += 1
+                logger.error(f"Error checking internet via {host} (attempt {attempt + 1}/{retries}): {e}")
 
-        # If failed and not last attempt, wait before retry
-        if attempt < retries - 1:
-            time.sleep(1)
+            # If failed and not last attempt, wait before retry
+            if attempt < retries - 1:
+                time.sleep(1)
 
     # All retries failed
     hosts_str = ', '.join(pinged_hosts)
     logger.warning(f"Internet check failed to [{hosts_str}]: {failed_attempts}/{retries} packets lost (100% packet loss)")
     return False
 
+def set_relay(energized):
+    """Drive the relay pin high (router off) or low (router on)."""
+    if relay_line is not None:
+        relay_line.set_value(1 if energized else 0)
+    else:
+        GPIO.output(config.relay_pin, GPIO.HIGH if energized else GPIO.LOW)
+
 def reboot_router():
     """Power cycle the router via relay."""
     logger.warning("Rebooting router...")
-    GPIO.output(config['relay_pin'], GPIO.HIGH)  # Turn router OFF
+    set_relay(True)   # Turn router OFF
     time.sleep(5)  # Keep router off for 5 seconds
-    GPIO.output(config['relay_pin'], GPIO.LOW)   # Turn router ON
+    set_relay(False)  # Turn router ON
     logger.info("Router reboot complete.")
     time.sleep(5)  # Take a breather before doing anything else
 
@@ -761,34 +1505,41 @@ def main():
 
     internet_was_online = True
     has_rebooted = False
+    # Grows while the connection stays healthy, reset on any failure
+    online_interval = config.check_interval_online
+    # Grows while an outage persists after the reboot, reset once back online
+    offline_interval = config.check_interval_offline
 
     logger.info("Router rebooter started. Monitoring internet connection...")
 
     # Get and display the actual IP address
     local_ip = get_local_ip()
-    protocol = "https" if config.get('ssl_enabled') else "http"
-    logger.info(f"Web interface available at {protocol}://{local_ip}:{config['http_port']}")
+    protocol = "https" if config.ssl_enabled else "http"
+    logger.info(f"Web interface available at {protocol}://{local_ip}:{config.http_port}")
 
     try:
         while True:
-            # Check for manual reboot requests from web interface
-            if not reboot_queue.empty():
-                reboot_queue.get()  # Clear the queue
-                reboot_router()
-                # Assume internet goes offline after manual reboot
-                internet_was_online = False
-                has_rebooted = True
-                continue
-
+            # Intervals are measured from the start of each check, so the time
+            # spent probing doesn't stretch the check cadence
+            check_started = time.monotonic()
             internet_is_online = check_internet()
 
             if internet_is_online:
                 if not internet_was_online:
                     logger.info("Internet connection restored!")
                     has_rebooted = False
+
+                    # The router may have handed out a new address after the outage
+                    new_ip = get_local_ip(max_age=0)
+                    if new_ip != local_ip:
+                        local_ip = new_ip
+                        logger.info(f"Web interface now available at {protocol}://{local_ip}:{config.http_port}")
                 internet_was_online = True
-                time.sleep(config['check_interval_online'])
+                offline_interval = config.check_interval_offline
+                interval = online_interval
+                online_interval = min(online_interval * 2, config.check_interval_online_max)
             else:
+                online_interval = config.check_interval_online
                 if internet_was_online:
                     logger.warning("Internet connection lost!")
                     internet_was_online = False
@@ -796,9 +1547,26 @@ def main():
                 if not has_rebooted:
                     reboot_router()
                     has_rebooted = True
-                else:
-                    logger.info(f"Internet still down (already rebooted). Checking again in {config['check_interval_offline']} seconds...")
-                    time.sleep(config['check_interval_offline'])
+                    continue
+
+                # Back off during long outages, with a little jitter so several
+                # devices on the same network don't probe in lockstep
+                interval = offline_interval * random.uniform(1, 1.1)
+                offline_interval = min(offline_interval * 2, config.check_interval_offline_max)
+                logger.info(f"Internet still down (already rebooted). Checking again in {interval:.0f} seconds...")
+
+            # Wait for the next check, waking immediately on a manual reboot request
+            try:
+                reboot_queue.get(timeout=max(0, check_started + interval - time.monotonic()))
+            except Empty:
+                continue
+
+            reboot_router()
+            # Assume internet goes offline after manual reboot
+            internet_was_online = False
+            has_rebooted = True
+            online_interval = config.check_interval_online
+            offline_interval = config.check_interval_offline
 
     except Exception as e:
         logger.error(f"Unexpected error in main loop: {e}")
@@ -834,12 +1602,12 @@ Examples:
         create_default_config(args.create_config)
         # create_default_config() calls sys.exit(), so we never reach here
 
-    # Load configuration into global config dict
-    config.update(load_config(args.config))
+    # Load configuration into global config
+    config = load_config(args.config)
 
     # Setup logging and GPIO based on config
-    setup_logging(config['log_file'], config['log_level'])
-    setup_gpio(config['relay_pin'])
+    setup_logging(config.log_file, config.log_level)
+    setup_gpio(config.relay_pin)
 
     # Run main loop
     main()